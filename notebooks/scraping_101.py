@@ -1,8 +1,63 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import diskcache
+import logging
+import math
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
+import threading
 import time
 from typing import List, Dict
-import json
+import orjson
+from tqdm import tqdm
+from tqdm.contrib.logging import logging_redirect_tqdm
+
+log = logging.getLogger('hermes')
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket allowing at most `max_calls` calls per `period` seconds.
+    Use as a context manager around each API call.
+    """
+
+    def __init__(self, max_calls, period=1.0):
+        """
+        Args:
+            max_calls (float): Calls allowed per period (also the burst size,
+                at least one call)
+            period (float): Length of the period in seconds
+        """
+        self.rate = max_calls / period
+        # The bucket must hold a whole token, or acquire() could never succeed
+        self.capacity = max(1.0, max_calls)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a call is allowed.
+        """
+        with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                time.sleep((1 - self.tokens) / self.rate)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
 
 class HermesRestaurantCollector:
     """
@@ -10,17 +65,100 @@ class HermesRestaurantCollector:
     Focuses on gathering restaurants in Barcelona with reviews
     """
 
-    def __init__(self, google_api_key):
+    NEARBY_URL = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+    NEARBY_PARAMS = {'type': 'restaurant', 'language': 'es'}
+
+    DETAILS_URL = "https://places.googleapis.com/v1/places/"
+    DETAILS_PARAMS = {'languageCode': 'es'}
+    DETAILS_FIELD_MASK = (
+        'id,displayName,formattedAddress,location,rating,userRatingCount,priceLevel,'
+        'nationalPhoneNumber,websiteUri,types,reviews,regularOpeningHours'
+    )
+
+    # Place Details fields unpacked into each enriched record, in order
+    DETAIL_KEYS = (
+        'displayName', 'formattedAddress', 'location', 'rating', 'userRatingCount',
+        'priceLevel', 'nationalPhoneNumber', 'websiteUri', 'types', 'reviews'
+    )
+
+    # Nearby Search returns at most 3 pages of 20 results per query
+    NEARBY_MAX_RESULTS = 60
+
+    # Place details barely change day to day; refetch them weekly
+    CACHE_EXPIRE = 7 * 24 * 3600
+
+    # Places API (New) reports price level as an enum
+    PRICE_LEVELS = {
+        'PRICE_LEVEL_FREE': 0,
+        'PRICE_LEVEL_INEXPENSIVE': 1,
+        'PRICE_LEVEL_MODERATE': 2,
+        'PRICE_LEVEL_EXPENSIVE': 3,
+        'PRICE_LEVEL_VERY_EXPENSIVE': 4
+    }
+
+    def __init__(self, google_api_key, qps=10, cache_dir='.hermes_cache', refresh=False):
         """
         Initialize the collector with Google Places API key.
 
         Args:
             google_api_key (str): Google Places API key
+            qps (float): Maximum requests per second sent to the API
+            cache_dir (str): Directory of the on-disk place details cache
+            refresh (bool): If True, ignore cached details and fetch them again
         """
         self.api_key = google_api_key
-        self.base_url = "https://maps.googleapis.com/maps/api/place"
+        self.qps = qps
         self.barcelona_coords = "41.3851,2.1734"
 
+        # Reuse one keep-alive connection pool for every Places API call
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=2,
+            pool_maxsize=32,
+            max_retries=Retry(
+                total=5,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                respect_retry_after_header=True,
+                # Hand the last error response back instead of raising RetryError
+                raise_on_status=False
+            )
+        )
+        self.session.mount("https://maps.googleapis.com", adapter)
+        self.session.mount("https://places.googleapis.com", adapter)
+        self.rate_limiter = RateLimiter(max_calls=qps, period=1.0)
+        self.details_headers = {
+            'X-Goog-Api-Key': self.api_key,
+            'X-Goog-FieldMask': self.DETAILS_FIELD_MASK
+        }
+
+        # Details already fetched by previous runs, keyed by (API version, place_id)
+        self.cache = diskcache.Cache(cache_dir)
+        self.refresh = refresh
+
+    def close(self):
+        """
+        Close the underlying HTTP session and the details cache.
+        """
+        self.session.close()
+        self.cache.close()
+
+    def _get(self, endpoint, params, headers=None):
+        """
+        Rate-limited GET against the Places API.
+
+        Args:
+            endpoint (str): Request URL
+            params (dict): Query parameters
+            headers (dict): Extra request headers
+
+        Returns:
+            dict: Decoded JSON response
+        """
+        with self.rate_limiter:
+            response = self.session.get(endpoint, params=params, headers=headers, timeout=(3.05, 10))
+        return orjson.loads(response.content)
+
     def get_restaurants_in_area(self, location=None, radius=5000):
         """
         Get all restaurants in a specific area of Barcelona.
@@ -35,46 +173,65 @@ class HermesRestaurantCollector:
         if location is None:
             location = self.barcelona_coords
 
-        endpoint = f"{self.base_url}/nearbysearch/json"
+        return self._search_area(location, radius)[0]
 
-        params = {
-            'location': location,
-            'radius': radius,
-            'type': 'restaurant',
-            'key': self.api_key,
-            'language': 'es'
-        }
+    def _search_area(self, location, radius):
+        """
+        Page through a Nearby Search, reporting whether it finished.
+
+        Args:
+            location (str): Coordinates as "lat,lng"
+            radius (int): Search radius in meters (max 50000)
+
+        Returns:
+            tuple: (results, complete) - the restaurant basic data found and
+                whether every page was fetched; False if pagination stopped on
+                an error, so the area may be missing restaurants
+        """
+        endpoint = self.NEARBY_URL
+        params = {**self.NEARBY_PARAMS, 'location': location, 'radius': radius, 'key': self.api_key}
 
         all_restaurants = []
+        token_polls = 0
 
         while True:
-            response = requests.get(endpoint, params=params)
-            data = response.json()
-
-            if data['status'] != 'OK':
-                if data['status'] == 'ZERO_RESULTS':
-                    print(f"No more results in this area")
-                else:
-                    print(f"Error: {data.get('status')}")
-                break
+            try:
+                data = self._get(endpoint, params)
+            except (requests.RequestException, orjson.JSONDecodeError) as e:
+                log.warning("Nearby Search error at %s: %s", location, e)
+                return all_restaurants, False
+
+            status = data.get('status')
+
+            # A new next_page_token takes a moment to become valid; poll until it is
+            if status == 'INVALID_REQUEST' and 'pagetoken' in params and token_polls < 20:
+                token_polls += 1
+                time.sleep(0.25)
+                continue
+
+            if status != 'OK':
+                if status == 'ZERO_RESULTS':
+                    log.info("No more results in this area")
+                    return all_restaurants, True
+                log.warning("Nearby Search error at %s: %s", location, status)
+                return all_restaurants, False
 
             all_restaurants.extend(data['results'])
 
             # Check for next page
             if 'next_page_token' in data:
-                time.sleep(2)  # Required by Google
                 params = {
                     'pagetoken': data['next_page_token'],
                     'key': self.api_key
                 }
+                token_polls = 0
             else:
-                break
-
-        return all_restaurants
+                return all_restaurants, True
 
     def get_restaurant_details(self, place_id):
         """
-        Get detailed information including reviews for a restaurant.
+        Get detailed information including reviews for a restaurant
+        from the Places API (New), requesting only the fields we use.
 
         Args:
             place_id (str): Google Place ID
@@ -82,90 +239,164 @@ class HermesRestaurantCollector:
         Returns:
             dict: Detailed restaurant information with reviews
         """
-        endpoint = f"{self.base_url}/details/json"
-
-        params = {
-            'place_id': place_id,
-            'key': self.api_key,
-            'fields': 'name,rating,formatted_address,geometry,formatted_phone_number,website,price_level,types,user_ratings_total,reviews,opening_hours',
-            'language': 'es'
-        }
-
-        response = requests.get(endpoint, params=params)
-        data = response.json()
+        cache_key = ('v1', place_id)
+        if not self.refresh:
+            # Single lookup: an entry may expire between a membership test and a read
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        try:
+            data = self._get(self.DETAILS_URL + place_id, self.DETAILS_PARAMS, self.details_headers)
+        except (requests.RequestException, orjson.JSONDecodeError) as e:
+            log.warning("Error getting details for %s: %s", place_id, e)
+            return None
 
-        if data['status'] == 'OK':
-            return data['result']
+        if 'error' not in data:
+            self.cache.set(cache_key, data, expire=self.CACHE_EXPIRE)
+            return data
         else:
-            print(f"Error getting details for {place_id}: {data.get('status')}")
+            log.warning("Error getting details for %s: %s", place_id, data['error'].get('status'))
             return None
 
-    def collect_barcelona_restaurants(self, num_areas=9):
+    def search_tile(self, center, half_side):
         """
-        Collect restaurants from multiple areas of Barcelona to get good coverage.
-        Barcelona is divided into a grid to ensure we capture all restaurants.
+        Run a Nearby Search over one square tile, using the circle
+        circumscribed around the square.
 
         Args:
-            num_areas (int): Number of areas to divide Barcelona (default: 9 for 3x3 grid)
+            center (tuple): Tile center as (lat, lng)
+            half_side (float): Half the tile's side length in meters
 
         Returns:
-            pd.DataFrame: All restaurants with basic info
+            tuple: (results, saturated, complete) - the restaurants found, whether
+                the tile hit the Nearby Search result cap, and whether pagination
+                finished without errors
         """
+        lat, lng = center
+        results, complete = self._search_area(
+            location=f"{lat:.6f},{lng:.6f}",
+            radius=round(half_side * math.sqrt(2))
+        )
+        return results, len(results) >= self.NEARBY_MAX_RESULTS, complete
+
+    @staticmethod
+    def split_tile(center, half_side):
+        """
+        Split a square tile into its four non-overlapping quadrants.
 
-        # Define multiple search points across Barcelona
-        search_points = [
-            ("41.3851,2.1734", "City Center"),      # Ciutat Vella
-            ("41.3874,2.1686", "Gothic Quarter"),    # Barri Gòtic
-            ("41.3947,2.1771", "Eixample"),          # Eixample
-            ("41.4036,2.1744", "Gràcia"),            # Gràcia
-            ("41.3797,2.1894", "Poblenou"),          # Poblenou
-            ("41.3609,2.1489", "Montjuïc"),          # Montjuïc
-            ("41.4145,2.1527", "Sant Andreu"),       # Sant Andreu
-            ("41.3716,2.1228", "Sants"),             # Sants
-            ("41.4331,2.1789", "Horta"),             # Horta-Guinardó
-        ]
-
-        all_restaurants = []
-        seen_place_ids = set()
-
-        for location, neighborhood in search_points:
+        Args:
+            center (tuple): Tile center as (lat, lng)
+            half_side (float): Half the tile's side length in meters
 
-            restaurants = self.get_restaurants_in_area(
-                location=location,
-                radius=2000
-            )
+        Returns:
+            list: Four (center, half_side) sub-tiles
+        """
+        lat, lng = center
+        sub_half_side = half_side / 2
+        dlat = sub_half_side / 111320
+        dlng = sub_half_side / (111320 * math.cos(math.radians(lat)))
+        return [
+            ((lat + sy * dlat, lng + sx * dlng), sub_half_side)
+            for sy in (-1, 1)
+            for sx in (-1, 1)
+        ]
 
-            # Remove duplicates
-            new_restaurants = []
-            for rest in restaurants:
-                if rest['place_id'] not in seen_place_ids:
-                    seen_place_ids.add(rest['place_id'])
-                    new_restaurants.append(rest)
+    def collect_barcelona_restaurants(self, half_side=8000, min_radius=250, max_workers=16,
+                                      max_tile_attempts=3, max_restaurants=None):
+        """
+        Collect restaurants across Barcelona with adaptive tiling.
+        Starts from a single square tile covering the city and only splits
+        tiles that hit the Nearby Search result cap into quadrants, so sparse
+        areas cost one query and dense areas are searched at finer resolution.
 
-            all_restaurants.extend(new_restaurants)
-            print(f"New restaurants found: {len(new_restaurants)}")
-            print(f"Total unique restaurants: {len(all_restaurants)}")
+        Args:
+            half_side (float): Half the side in meters of the initial square tile
+                around the city center
+            min_radius (float): Saturated tiles are not split once their search
+                radius would drop below this
+            max_workers (int): Number of tiles searched concurrently
+            max_tile_attempts (int): Times a tile whose search failed part way
+                is searched before its coverage is given up
+            max_restaurants (int): Stop searching once this many unique
+                restaurants are found (for testing)
 
-            # Respectful delay between areas
-            time.sleep(3)
+        Returns:
+            list: All restaurants with basic info
+        """
+        center = tuple(float(x) for x in self.barcelona_coords.split(','))
+        tiles = [(center, half_side, 1)]
+
+        # Unique restaurants keyed by place_id
+        all_restaurants = {}
+
+        # Search each level of tiles at once so one tile's next_page_token
+        # wait overlaps with requests for the others
+        with ThreadPoolExecutor(max_workers=max_workers) as ex:
+            while tiles:
+                futures = {
+                    ex.submit(self.search_tile, tile[0], tile[1]): tile
+                    for tile in tiles
+                }
+                tiles = []
+
+                for fut in as_completed(futures):
+                    restaurants, saturated, complete = fut.result()
+                    tile_center, tile_half_side, attempt = futures[fut]
+
+                    # Remove duplicates
+                    num_before = len(all_restaurants)
+                    all_restaurants.update((r['place_id'], r) for r in restaurants)
+
+                    log.info("Tile %.4f,%.4f h=%dm: %d new restaurants found, %d unique in total",
+                             *tile_center, tile_half_side, len(all_restaurants) - num_before,
+                             len(all_restaurants))
+
+                    if max_restaurants and len(all_restaurants) >= max_restaurants:
+                        # Enough found; don't start the tiles still queued
+                        for pending in futures:
+                            pending.cancel()
+                        tiles = []
+                        break
+
+                    # An early stop under 60 results does not mean the tile is covered
+                    if not complete and not saturated:
+                        if attempt < max_tile_attempts:
+                            tiles.append((tile_center, tile_half_side, attempt + 1))
+                        else:
+                            log.warning("Tile %.4f,%.4f h=%dm failed %d times; its coverage may be incomplete",
+                                        *tile_center, tile_half_side, attempt)
+                    elif saturated:
+                        if tile_half_side / 2 * math.sqrt(2) >= min_radius:
+                            tiles.extend((sub_center, sub_half_side, 1)
+                                         for sub_center, sub_half_side in self.split_tile(tile_center, tile_half_side))
+                        else:
+                            log.warning("Tile %.4f,%.4f h=%dm is saturated at the minimum radius",
+                                        *tile_center, tile_half_side)
 
         print(f"\n{'='*60}")
         print(f"Collection complete!")
         print(f"Total restaurants found: {len(all_restaurants)}")
         print(f"{'='*60}")
 
-        return all_restaurants
+        return list(all_restaurants.values())
 
-    def enrich_with_details_and_reviews(self, restaurants, max_restaurants=None):
+    def enrich_with_details_and_reviews(self, restaurants, max_restaurants=None, max_workers=16):
         """
         Enrich basic restaurant data with detailed info and reviews.
 
+        Details are fetched by a thread pool sharing the collector's session,
+        so the rate limiter, retries and cache apply to every request.
+        Records are yielded as soon as they are ready, so callers can write
+        them out without holding the whole collection in memory.
+
         Args:
             restaurants (list): List of basic restaurant data
             max_restaurants (int): Limit number of restaurants to process (for testing)
+            max_workers (int): Number of threads fetching details concurrently
 
-        Returns:
-            list: Enriched restaurant data with reviews
+        Yields:
+            dict: Enriched restaurant data with reviews
         """
         if max_restaurants:
             restaurants = restaurants[:max_restaurants]
@@ -174,86 +405,152 @@ class HermesRestaurantCollector:
         print(f"Enriching {len(restaurants)} restaurants with details and reviews")
         print(f"{'='*60}")
 
-        enriched_data = []
-
-        for idx, restaurant in enumerate(restaurants, 1):
-            print(f"\n[{idx}/{len(restaurants)}] {restaurant.get('name', 'Unknown')}")
-
-            details = self.get_restaurant_details(restaurant['place_id'])
-
-            if details:
-                # Merge basic info with detailed info
-                enriched = {
-                    'place_id': restaurant['place_id'],
-                    'name': details.get('name'),
-                    'address': details.get('formatted_address'),
-                    'lat': details['geometry']['location']['lat'],
-                    'lng': details['geometry']['location']['lng'],
-                    'rating': details.get('rating'),
-                    'total_reviews': details.get('user_ratings_total', 0),
-                    'price_level': details.get('price_level'),
-                    'phone': details.get('formatted_phone_number'),
-                    'website': details.get('website'),
-                    'types': ', '.join(details.get('types', [])),
-                    'reviews': details.get('reviews', [])  # Max 5 reviews from Google
-                }
-
-                enriched_data.append(enriched)
-                print(f"   ✓ Rating: {enriched['rating']}, Reviews: {len(enriched['reviews'])}")
-
-            # Delay to respect API limits (important!)
-            time.sleep(0.5)
-
-        return enriched_data
-
-    def save_to_json(self, data, filename='hermes_restaurants.json'):
+        ex = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = {
+                ex.submit(self.get_restaurant_details, r['place_id']): r
+                for r in restaurants
+            }
+
+            # Route log records through tqdm.write so warnings don't break the bar
+            with logging_redirect_tqdm():
+                for fut in tqdm(as_completed(futures), total=len(futures), desc="Enriching"):
+                    # Drop the future so its result can be freed once yielded
+                    restaurant = futures.pop(fut)
+                    details = fut.result()
+
+                    if details:
+                        (display_name, address, location, rating, num_ratings,
+                         price_level, phone, website, types, reviews) = map(details.get, self.DETAIL_KEYS)
+                        location = location or {}
+
+                        # Merge basic info with detailed info
+                        enriched = {
+                            'place_id': restaurant['place_id'],
+                            'name': display_name['text'] if display_name else None,
+                            'address': address,
+                            'lat': location.get('latitude'),
+                            'lng': location.get('longitude'),
+                            'rating': rating,
+                            'total_reviews': num_ratings or 0,
+                            'price_level': self.PRICE_LEVELS.get(price_level),
+                            'phone': phone,
+                            'website': website,
+                            'types': ', '.join(types or ()),
+                            'reviews': reviews or []  # Max 5 reviews from Google
+                        }
+
+                        log.debug("%s: rating %s, %d reviews",
+                                  enriched['name'], enriched['rating'], len(enriched['reviews']))
+                        yield enriched
+        finally:
+            # Don't work through the remaining queue if a fetch failed or the
+            # consumer stopped early
+            ex.shutdown(wait=False, cancel_futures=True)
+
+    def save_to_json(self, data, filename='hermes_restaurants.json', lines=False):
         """
         Save collected data to JSON file.
 
         Args:
-            data (list): Restaurant data
+            data (iterable): Restaurant data; any iterable when `lines` is True
             filename (str): Output filename
+            lines (bool): If True, stream JSON Lines (one restaurant per line)
+                instead of a single indented JSON array
         """
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        with open(filename, 'wb') as f:
+            if lines:
+                for rec in data:
+                    f.write(orjson.dumps(rec))
+                    f.write(b'\n')
+            else:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
         print(f"\n✓ Data saved to {filename}")
 
+    def load_jsonl(self, filename='hermes_restaurants.jsonl'):
+        """
+        Lazily read records back from a JSON Lines file.
+
+        Args:
+            filename (str): JSON Lines file written by `save_to_json(..., lines=True)`
+
+        Yields:
+            dict: One restaurant record per line
+        """
+        with open(filename, 'rb') as f:
+            for line in f:
+                yield orjson.loads(line)
+
     def create_dataframe(self, enriched_data):
         """
         Convert enriched data to pandas DataFrame for analysis.
+        The data is consumed in a single pass, so it may be a generator.
 
         Args:
-            enriched_data (list): Enriched restaurant data
+            enriched_data (iterable): Enriched restaurant data
 
         Returns:
-            tuple: (df_restaurants, df_reviews) - Two separate DataFrames
+            tuple: (df_restaurants, df_reviews) - Two separate DataFrames.
+                The reviews `time` column is a UTC datetime parsed from the
+                Places API `publishTime` timestamp.
         """
-        # Main restaurants DataFrame
-        restaurants = []
-        all_reviews = []
+        restaurant_rows = []
+        review_rows = []
 
         for rest in enriched_data:
-            # Restaurant info
-            rest_data = {k: v for k, v in rest.items() if k != 'reviews'}
-            rest_data['num_reviews_collected'] = len(rest.get('reviews', []))
-            restaurants.append(rest_data)
-
-            # Reviews (separate table)
-            for review in rest.get('reviews', []):
-                review_data = {
-                    'place_id': rest['place_id'],
-                    'restaurant_name': rest['name'],
-                    'author_name': review.get('author_name'),
-                    'rating': review.get('rating'),
-                    'text': review.get('text'),
-                    'time': review.get('time'),
-                    'language': review.get('language'),
-                    'relative_time': review.get('relative_time_description')
-                }
-                all_reviews.append(review_data)
-
-        df_restaurants = pd.DataFrame(restaurants)
-        df_reviews = pd.DataFrame(all_reviews)
+            place_id, name = rest['place_id'], rest['name']
+            reviews = rest.get('reviews', ())
+            types = rest.get('types')
+
+            # Restaurant info (reviews go to a separate table)
+            restaurant_rows.append((
+                place_id,
+                name,
+                rest.get('address'),
+                rest.get('lat'),
+                rest.get('lng'),
+                rest.get('rating'),
+                rest.get('total_reviews'),
+                rest.get('price_level'),
+                rest.get('phone'),
+                rest.get('website'),
+                types,
+                types.partition(', ')[0] if types else None,  # Google lists the main type first
+                len(reviews)
+            ))
+
+            # Reviews, one tuple per review tagged with its restaurant
+            for review in reviews:
+                text = review.get('text', {})
+                review_rows.append((
+                    place_id,
+                    name,
+                    review.get('authorAttribution', {}).get('displayName'),
+                    review.get('rating'),
+                    text.get('text'),
+                    review.get('publishTime'),
+                    text.get('languageCode'),
+                    review.get('relativePublishTimeDescription')
+                ))
+
+        df_restaurants = pd.DataFrame(
+            restaurant_rows,
+            columns=['place_id', 'name', 'address', 'lat', 'lng', 'rating', 'total_reviews',
+                     'price_level', 'phone', 'website', 'types', 'types_primary',
+                     'num_reviews_collected']
+        ).astype({
+            'rating': 'float32',
+            'total_reviews': 'int32',
+            'price_level': 'Int8',
+            'types_primary': 'category'
+        })
+
+        df_reviews = pd.DataFrame(
+            review_rows,
+            columns=['place_id', 'restaurant_name', 'author_name', 'rating',
+                     'text', 'time', 'language', 'relative_time']
+        ).astype({'language': 'category'})
+        df_reviews['time'] = pd.to_datetime(df_reviews['time'], utc=True, format='ISO8601')
 
         return df_restaurants, df_reviews
 
@@ -262,41 +559,49 @@ class HermesRestaurantCollector:
 # USAGE EXAMPLE FOR HERMES
 # ============================================================
 
-def collect_hermes_database(api_key, test_mode=False):
+def collect_hermes_database(api_key, test_mode=False, csv=False, refresh=False):
     """
     Complete pipeline to collect restaurant database for HERMES.
 
     Args:
         api_key (str): Google Places API key
         test_mode (bool): If True, only process 10 restaurants for testing
+        csv (bool): If True, also write CSV copies of the tables
+        refresh (bool): If True, bypass the details cache from previous runs
     """
 
     # Initialize collector
-    collector = HermesRestaurantCollector(api_key)
-
-    # Step 1: Collect all restaurants in Barcelona
-    print("\n🔍 STEP 1: Collecting restaurants across Barcelona...")
-    restaurants = collector.collect_barcelona_restaurants()
-
-    # Step 2: Enrich with details and reviews
-    print("\n📝 STEP 2: Getting detailed info and reviews...")
-    max_rest = 10 if test_mode else None
-    enriched_data = collector.enrich_with_details_and_reviews(
-        restaurants,
-        max_restaurants=max_rest
+    collector = HermesRestaurantCollector(api_key, refresh=refresh)
+
+    try:
+        # Step 1: Collect all restaurants in Barcelona
+        print("\n🔍 STEP 1: Collecting restaurants across Barcelona...")
+        max_rest = 10 if test_mode else None
+        restaurants = collector.collect_barcelona_restaurants(max_restaurants=max_rest)
+
+        # Step 2: Enrich with details and reviews, streaming each record to disk
+        print("\n📝 STEP 2: Getting detailed info and reviews...")
+        enriched_data = collector.enrich_with_details_and_reviews(
+            restaurants,
+            max_restaurants=max_rest
+        )
+        collector.save_to_json(enriched_data, 'hermes_restaurants_raw.jsonl', lines=True)
+    finally:
+        collector.close()
+
+    # Step 3: Create structured DataFrames
+    print("\n📊 STEP 3: Creating structured datasets...")
+    df_restaurants, df_reviews = collector.create_dataframe(
+        collector.load_jsonl('hermes_restaurants_raw.jsonl')
     )
 
-    # Step 3: Save to files
-    print("\n💾 STEP 3: Saving data...")
-    collector.save_to_json(enriched_data, 'hermes_restaurants_raw.json')
-
-    # Step 4: Create structured DataFrames
-    print("\n📊 STEP 4: Creating structured datasets...")
-    df_restaurants, df_reviews = collector.create_dataframe(enriched_data)
+    # Save to Parquet
+    df_restaurants.to_parquet('hermes_restaurants.parquet', engine='pyarrow', compression='zstd', index=False)
+    df_reviews.to_parquet('hermes_reviews.parquet', engine='pyarrow', compression='zstd', index=False)
 
-    # Save to CSV
-    df_restaurants.to_csv('hermes_restaurants.csv', index=False)
-    df_reviews.to_csv('hermes_reviews.csv', index=False)
+    if csv:
+        df_restaurants.to_csv('hermes_restaurants.csv', index=False)
+        df_reviews.to_csv('hermes_reviews.csv', index=False)
 
     # Show summary
     print("\n" + "="*60)
@@ -316,9 +621,16 @@ def collect_hermes_database(api_key, test_mode=False):
 if __name__ == "__main__":
     API_KEY = "YOUR_API_KEY_HERE"
 
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+
+    parser = argparse.ArgumentParser(description="Collect the HERMES restaurant database")
+    parser.add_argument('--csv', action='store_true', help="Also write CSV copies of the tables")
+    parser.add_argument('--refresh', action='store_true', help="Refetch details already in the cache")
+    args = parser.parse_args()
+
     # Start with test mode to verify everything works
     print("Running in TEST MODE (10 restaurants only)...")
-    df_rest, df_rev = collect_hermes_database(API_KEY, test_mode=True)
+    df_rest, df_rev = collect_hermes_database(API_KEY, test_mode=True, csv=args.csv, refresh=args.refresh)
 
     # Once verified, run full collection:
-    # df_rest, df_rev = collect_hermes_database(API_KEY, test_mode=False)
+    # df_rest, df_rev = collect_hermes_database(API_KEY, test_mode=False, csv=args.csv, refresh=args.refresh)